@@ -1,107 +1,39 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize, to_hex
+from matplotlib.figure import Figure
+import io
 from pathlib import Path
 
 
+# Streamlit renders server-side; pick Agg before geopandas pulls in pyplot.
+matplotlib.use("Agg")
+# Let Agg drop sub-pixel vertices and draw long paths in chunks
+matplotlib.rcParams.update({
+    "path.simplify": True,
+    "path.simplify_threshold": 1.0,
+    "agg.path.chunksize": 10000,
+})
+
 st.set_page_config(page_title="Silver Price & Sales Dashboard", layout="wide")
 
 BASE_DIR = Path(__file__).resolve().parent
 
+MAP_CMAP = matplotlib.colormaps["Greys"]
 
-@st.cache_data
-def load_price_data() -> pd.DataFrame:
-    return pd.read_csv(BASE_DIR / "historical_silver_price.csv")
-
-
-@st.cache_data
-def load_sales_data() -> pd.DataFrame:
-    return pd.read_csv(BASE_DIR / "state_wise_silver_purchased_kg.csv")
-
-
-@st.cache_data
-def load_india_boundary() -> gpd.GeoDataFrame:
-    return gpd.read_file(BASE_DIR / "shapefile" / "india_India_Country_Boundary.geojson")
-
-
-@st.cache_data
-def load_state_capitals() -> gpd.GeoDataFrame:
-    return gpd.read_file(BASE_DIR / "shapefile" / "State_Capitals.shp")
-
-
-price_df = load_price_data()
-sales_df = load_sales_data()
-india_capitals = load_state_capitals()
-india_boundary = load_india_boundary()
-
-capitals_code_col = None
-for col in india_capitals.columns:
-    if col.lower() == "state":
-        capitals_code_col = col
-        break
-
-# ================= SIDEBAR =================
-st.sidebar.header("Silver Price Calculator")
-
-weight = st.sidebar.number_input("Weight of Silver", min_value=0.0, step=1.0)
-unit = st.sidebar.selectbox("Unit", ["grams", "kilograms"])
-price_per_gram = st.sidebar.number_input("Price per gram (INR)", min_value=0.0)
-
-currency = st.sidebar.selectbox("Currency", ["INR", "USD"])
-usd_rate = 83.0  
-
-weight_in_grams = weight if unit == "grams" else weight * 1000
-total_cost_inr = weight_in_grams * price_per_gram
-total_cost = total_cost_inr / usd_rate if currency == "USD" else total_cost_inr
-
-st.sidebar.subheader("Total Cost")
-st.sidebar.write(f"{currency} {total_cost:,.2f}")
-
-
-# ================= PRICE ANALYSIS =================
-st.header("Historical Silver Price Analysis")
-
-price_filter = st.selectbox(
-    "Filter price range (INR per kg)",
-    ["≤ 20,000", "20,000 – 30,000", "≥ 30,000"]
-)
-
-if price_filter == "≤ 20,000":
-    filtered_price = price_df[price_df["Silver_Price_INR_per_kg"] <= 20000]
-elif price_filter == "20,000 – 30,000":
-    filtered_price = price_df[
-        (price_df["Silver_Price_INR_per_kg"] > 20000) &
-        (price_df["Silver_Price_INR_per_kg"] < 30000)
-    ]
-else:
-    filtered_price = price_df[price_df["Silver_Price_INR_per_kg"] >= 30000]
-
-fig, ax = plt.subplots()
-ax.plot(filtered_price["Year"], filtered_price["Silver_Price_INR_per_kg"])
-ax.set_xlabel("Year")
-ax.set_ylabel("Price (INR per kg)")
-ax.set_title("Silver Price Trend")
-plt.xticks(rotation=90)
-st.pyplot(fig)
-
-
-# ================= INDIA MAP =================
-st.header("India State-wise Silver Purchases")
-if capitals_code_col is None:
-    st.error("Could not find a 'state' code column in State_Capitals.shp")
-    st.stop()
-
-
-def normalize_state_name(value: str) -> str:
-    value = str(value or "").strip()
-    value = " ".join(value.split())
-    return value
-
+PRICE_RANGES = {
+    "≤ 20,000": "low",
+    "20,000 – 30,000": "mid",
+    "≥ 30,000": "high",
+}
 
-# Your State_Capitals.shp is a *points* layer (capitals), not state polygons.
-# So instead of a choropleth fill, we plot the India boundary + capital points
-# sized/colored by the 'Silver_Purchased_kg' value.
+# Sales state names -> the two-letter codes in State_Capitals.shp.
+# The shapefile folder has no state polygon layer (District.shp only covers
+# Karnataka), so there is nothing to spatially join the capitals against.
 STATE_NAME_TO_CODE = {
     "Andhra Pradesh": "AP",
     "Arunachal Pradesh": "AR",
@@ -137,109 +69,263 @@ STATE_NAME_TO_CODE = {
     "Ladakh": "LA",
 }
 
-sales_df = sales_df.copy()
-sales_df["State"] = sales_df["State"].map(normalize_state_name)
-sales_df["state_code"] = sales_df["State"].map(STATE_NAME_TO_CODE)
 
-missing_state_codes = sales_df[sales_df["state_code"].isna()]["State"].unique().tolist()
-if missing_state_codes:
-    st.warning(
-        "Some state names couldn't be mapped to the shapefile state codes. "
-        f"Missing: {', '.join(missing_state_codes)}"
+@st.cache_data(show_spinner=False)
+def load_price_data() -> pd.DataFrame:
+    df = pd.read_parquet(BASE_DIR / "historical_silver_price.parquet", engine="pyarrow")
+    price = df["Silver_Price_INR_per_kg"]
+    df["price_range"] = pd.Categorical(
+        np.select([price <= 20000, price < 30000], ["low", "mid"], default="high"),
+        categories=list(PRICE_RANGES.values()),
     )
+    return df
 
-capitals = india_capitals[[capitals_code_col, "geometry"]].copy()
-capitals = capitals.rename(columns={capitals_code_col: "state_code"})
 
-merged_map = capitals.merge(
-    sales_df[["State", "state_code", "Silver_Purchased_kg"]],
-    on="state_code",
-    how="left",
-)
+# Used on every rerun, so the shared frame is handed out instead of a fresh
+# unpickled copy; nothing below mutates it.
+@st.cache_resource(show_spinner=False)
+def load_sales_data() -> pd.DataFrame:
+    df = pd.read_parquet(BASE_DIR / "state_wise_silver_purchased_kg.parquet", engine="pyarrow")
+    df["State"] = (
+        df["State"].str.strip().str.replace(r"\s+", " ", regex=True).astype("category")
+    )
+    df["state_code"] = df["State"].map(STATE_NAME_TO_CODE).astype("category")
+    df.attrs["qty_col"] = next(
+        (col for col in df.columns if "silver" in col.lower() and "kg" in col.lower()),
+        None,
+    )
+    return df
+
+
+def to_plot_crs(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    # Layers without a .prj are assumed to already be lon/lat
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:4326")
+    return gdf.to_crs("EPSG:4326")
+
 
-try:
-    # Ensure consistent CRS for plotting
-    if india_boundary.crs is None:
-        india_boundary = india_boundary.set_crs("EPSG:4326")
-    if merged_map.crs is None:
-        merged_map = merged_map.set_crs(india_capitals.crs or "EPSG:4326")
-
-    india_boundary = india_boundary.to_crs("EPSG:4326")
-    merged_map = merged_map.to_crs("EPSG:4326")
-except Exception as exc:
-    st.error(f"Failed to reproject map layers: {exc}")
-    st.stop()
-
-
-fig, ax = plt.subplots(1, 1, figsize=(12, 10))
-india_boundary.plot(ax=ax, color="#F5F5F5", edgecolor="#222222", linewidth=0.8)
-
-plot_df = merged_map.dropna(subset=["Silver_Purchased_kg"]).copy()
-if plot_df.empty:
-    st.error("No sales data could be joined to the map (check state code mapping).")
-else:
-    # Bubble size scaling
-    max_val = float(plot_df["Silver_Purchased_kg"].max())
-    plot_df["_size"] = (plot_df["Silver_Purchased_kg"] / max_val).clip(0, 1) * 800 + 40
-
-    plot_df.plot(
-        ax=ax,
-        column="Silver_Purchased_kg",
-        cmap="Greys",
-        legend=True,
-        markersize=plot_df["_size"],
-        alpha=0.85,
-        edgecolor="black",
-        linewidth=0.5,
+# GeoDataFrames are kept as shared resources so reruns skip the pickle round-trip
+# that st.cache_data does on every hit; callers must not mutate them in place.
+@st.cache_resource(show_spinner=False)
+def load_india_boundary() -> gpd.GeoDataFrame:
+    gdf = gpd.read_file(
+        BASE_DIR / "shapefile" / "india_India_Country_Boundary.geojson", engine="pyogrio"
     )
+    gdf = to_plot_crs(gdf)[["geometry"]]
+    # ~1 km in degrees; far below what a 12x10 inch figure can show
+    gdf["geometry"] = gdf.geometry.simplify(0.01, preserve_topology=True)
+    return gdf
 
-ax.set_title("State/UT-wise Silver Purchases (kg) — capital point map")
-ax.axis("off")
-st.pyplot(fig)
 
-with st.expander("Show map join preview"):
-    st.dataframe(merged_map[["state_code", "State", "Silver_Purchased_kg"]])
+@st.cache_resource(show_spinner=False)
+def load_state_capitals() -> gpd.GeoDataFrame:
+    gdf = gpd.read_file(BASE_DIR / "shapefile" / "State_Capitals.shp", engine="pyogrio")
+    state_col = next((col for col in gdf.columns if col.lower() == "state"), None)
+    gdf = to_plot_crs(gdf)[[col for col in (state_col, "geometry") if col]]
+    gdf.attrs["state_col"] = state_col
+    return gdf
+
+
+@st.cache_resource(show_spinner=False)
+def split_price_ranges() -> dict[str, pd.DataFrame]:
+    price_df = load_price_data()
+    return {
+        code: price_df[price_df["price_range"] == code]
+        for code in PRICE_RANGES.values()
+    }
+
+
+@st.cache_data(show_spinner=False)
+def find_unmapped_states() -> list[str]:
+    sales_df = load_sales_data()
+    return sales_df.loc[sales_df["state_code"].isna(), "State"].dropna().unique().tolist()
+
+
+# _sales_df is skipped by Streamlit's hasher: it is derived from the cached
+# sales loader, so the capitals column name is the only input that can vary.
+# Both layers come out of their loaders already in EPSG:4326.
+@st.cache_resource(show_spinner=False)
+def build_merged_map(capitals_code_col: str, _sales_df: pd.DataFrame) -> gpd.GeoDataFrame:
+    capitals = load_state_capitals()[[capitals_code_col, "geometry"]].rename(
+        columns={capitals_code_col: "state_code"}
+    )
 
+    merged_map = capitals.merge(
+        _sales_df[["State", "state_code", "Silver_Purchased_kg"]],
+        on="state_code",
+        how="left",
+    )
 
-# ================= TOP 5 STATES =================
-st.header("Top 5 States – Silver Purchases")
+    # Bubble size scaling and colors, with the color range kept for the colorbar
+    values = merged_map["Silver_Purchased_kg"]
+    norm = Normalize(vmin=values.min(), vmax=values.max())
+    merged_map["_size"] = (values / norm.vmax).clip(0, 1) * 800 + 40
+    merged_map["_color"] = [to_hex(rgba) for rgba in MAP_CMAP(norm(values.to_numpy()))]
+    merged_map.attrs["color_range"] = (float(norm.vmin), float(norm.vmax))
+    return merged_map
 
-top5 = sales_df.sort_values(
-    "Silver_Purchased_kg", ascending=False
-).head(5)
 
-fig, ax = plt.subplots()
-ax.bar(top5["State"], top5["Silver_Purchased_kg"])
-ax.set_xlabel("State")
-ax.set_ylabel("Silver Purchased (kg)")
-ax.set_title("Top 5 Silver Consuming States")
-st.pyplot(fig)
+def build_map_figure(india_boundary: gpd.GeoDataFrame, merged_map: gpd.GeoDataFrame) -> Figure:
+    fig = Figure(figsize=(12, 10))
+    ax = fig.subplots()
+    india_boundary.plot(ax=ax, color="#F5F5F5", edgecolor="#222222", linewidth=0.8)
 
+    plot_df = merged_map.dropna(subset=["Silver_Purchased_kg"])
+    if not plot_df.empty:
+        plot_df.plot(
+            ax=ax,
+            color=plot_df["_color"],
+            markersize=plot_df["_size"],
+            alpha=0.85,
+            edgecolor="black",
+            linewidth=0.5,
+        )
+        norm = Normalize(*merged_map.attrs["color_range"])
+        fig.colorbar(ScalarMappable(norm=norm, cmap=MAP_CMAP), ax=ax)
+
+    ax.set_title("State/UT-wise Silver Purchases (kg) — capital point map")
+    ax.axis("off")
+    return fig
 
-# ================= JANUARY SALES =================
-st.header("State-wise Silver Sales – January")
 
-qty_col = None
-for col in sales_df.columns:
-    if "silver" in col.lower() and "kg" in col.lower():
-        qty_col = col
-        break
+# The map only depends on the static datasets, so it is rendered to PNG once
+# and every rerun just re-sends the bytes.
+@st.cache_data(show_spinner=False)
+def render_map_png(capitals_code_col: str) -> bytes:
+    merged_map = build_merged_map(capitals_code_col, load_sales_data())
+    fig = build_map_figure(load_india_boundary(), merged_map)
 
-if qty_col is None:
-    st.error("Silver quantity column not found in dataset.")
-    st.stop()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=110, bbox_inches="tight")
+    return buf.getvalue()
 
-total_january_sales = sales_df[qty_col].sum()
 
-st.subheader("Overall Silver Sales in January")
+@st.cache_data(show_spinner=False)
+def find_top5_states() -> pd.DataFrame:
+    return load_sales_data().nlargest(5, "Silver_Purchased_kg")
+
+
+@st.cache_data(show_spinner=False)
+def sum_sales(qty_col: str) -> float:
+    return float(np.add.reduce(load_sales_data()[qty_col].to_numpy(), dtype=np.float64))
+
+
+sales_df = load_sales_data()
+india_capitals = load_state_capitals()
+
+capitals_code_col = india_capitals.attrs["state_col"]
 
-st.metric(
-    label="Total Silver Sold (kg)",
-    value=f"{total_january_sales:,.2f}"
+# ================= SIDEBAR =================
+st.sidebar.header("Silver Price Calculator")
+
+weight = st.sidebar.number_input("Weight of Silver", min_value=0.0, step=1.0)
+unit = st.sidebar.selectbox("Unit", ["grams", "kilograms"])
+price_per_gram = st.sidebar.number_input("Price per gram (INR)", min_value=0.0)
+
+currency = st.sidebar.selectbox("Currency", ["INR", "USD"])
+usd_rate = 83.0  
+
+weight_in_grams = weight if unit == "grams" else weight * 1000
+total_cost_inr = weight_in_grams * price_per_gram
+total_cost = total_cost_inr / usd_rate if currency == "USD" else total_cost_inr
+
+st.sidebar.subheader("Total Cost")
+st.sidebar.write(f"{currency} {total_cost:,.2f}")
+
+
+# Only the open tab is rendered; switching tabs triggers a rerun, so sidebar
+# interactions no longer redraw every section.
+price_tab, map_tab, top5_tab, january_tab = st.tabs(
+    ["Prices", "Map", "Top 5 States", "January"], key="section", on_change="rerun"
 )
 
-fig, ax = plt.subplots()
-ax.bar(["January"], [total_january_sales])
-ax.set_ylabel("Silver Purchased (kg)")
-ax.set_title("Overall Silver Sales – January")
-st.pyplot(fig)
+# ================= PRICE ANALYSIS =================
+if price_tab.open:
+    with price_tab:
+        st.header("Historical Silver Price Analysis")
+
+        # The selectbox's own state is dropped while another tab is open, so the
+        # choice is mirrored under a separate key and restored via index=.
+        price_options = list(PRICE_RANGES)
+        price_filter = st.selectbox(
+            "Filter price range (INR per kg)",
+            price_options,
+            index=price_options.index(st.session_state.get("price_range", price_options[0])),
+            key="price_range_select",
+        )
+        st.session_state["price_range"] = price_filter
+
+        filtered_price = split_price_ranges()[PRICE_RANGES[price_filter]]
+
+        st.line_chart(
+            filtered_price,
+            x="Year",
+            y="Silver_Price_INR_per_kg",
+            x_label="Year",
+            y_label="Price (INR per kg)",
+        )
+
+
+# ================= INDIA MAP =================
+if map_tab.open:
+    with map_tab:
+        st.header("India State-wise Silver Purchases")
+        if capitals_code_col is None:
+            st.error("Could not find a 'state' code column in State_Capitals.shp")
+            st.stop()
+
+        # Your State_Capitals.shp is a *points* layer (capitals), not state polygons.
+        # So instead of a choropleth fill, we plot the India boundary + capital points
+        # sized/colored by the 'Silver_Purchased_kg' value.
+        missing_state_codes = find_unmapped_states()
+        if missing_state_codes:
+            st.warning(
+                "Some state names couldn't be mapped to the shapefile state codes. "
+                f"Missing: {', '.join(missing_state_codes)}"
+            )
+
+        merged_map = build_merged_map(capitals_code_col, sales_df)
+
+        if merged_map["Silver_Purchased_kg"].isna().all():
+            st.error("No sales data could be joined to the map (check state code mapping).")
+
+        st.image(render_map_png(capitals_code_col), width="stretch")
+
+        with st.expander("Show map join preview"):
+            st.dataframe(merged_map[["state_code", "State", "Silver_Purchased_kg"]])
+
+
+# ================= TOP 5 STATES =================
+if top5_tab.open:
+    with top5_tab:
+        st.header("Top 5 States – Silver Purchases")
+
+        st.bar_chart(
+            find_top5_states(),
+            x="State",
+            y="Silver_Purchased_kg",
+            x_label="State",
+            y_label="Silver Purchased (kg)",
+            sort=False,
+        )
+
+
+# ================= JANUARY SALES =================
+if january_tab.open:
+    with january_tab:
+        st.header("State-wise Silver Sales – January")
+
+        qty_col = sales_df.attrs["qty_col"]
+
+        if qty_col is None:
+            st.error("Silver quantity column not found in dataset.")
+            st.stop()
+
+        total_january_sales = sum_sales(qty_col)
+
+        st.subheader("Overall Silver Sales in January")
+
+        st.metric(
+            label="Total Silver Sold (kg)",
+            value=f"{total_january_sales:,.2f}"
+        )
\ No newline at end of file
@@ -0,0 +1,24 @@
+import pandas as pd
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Column types for each dataset; the dashboard reads the Parquet files as-is.
+DTYPES = {
+    "historical_silver_price.csv": {"Year": "int16", "Silver_Price_INR_per_kg": "float32"},
+    "state_wise_silver_purchased_kg.csv": {"Silver_Purchased_kg": "float32"},
+}
+
+
+def convert(csv_name: str, dtype: dict) -> Path:
+    csv_path = BASE_DIR / csv_name
+    parquet_path = csv_path.with_suffix(".parquet")
+    df = pd.read_csv(csv_path, engine="pyarrow", dtype=dtype)
+    df.to_parquet(parquet_path, engine="pyarrow", compression="zstd", index=False)
+    return parquet_path
+
+
+if __name__ == "__main__":
+    for csv_name, dtype in DTYPES.items():
+        print(f"Wrote {convert(csv_name, dtype).name}")